@@ -12,15 +12,34 @@
 #             Anexos III a VI (K1..K4) e Anexo VII (Resumo do cálculo do Fator K)
 # -------------------------------------------------------------
 
-import io
+import os
 import math
 import json
 import datetime as dt
-from typing import Optional, Dict, List
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional, Dict
 
+import numpy as np
 import pandas as pd
 import streamlit as st
 
+from constantes import (
+    DEFAULTS_K,
+    IC_INDICADORES,
+    IC_OPCOES,
+    K_NAMES,
+    PARCELAMENTO_PRESETS,
+    TIP_LABEL_IDX,
+    TIP_LABELS,
+    TIPOLOGIAS_BH_DF,
+    UFS,
+)
+
+# Cache em disco dos kernels Numba (sobrevive a reinícios/deploys); precisa ser definido antes
+# de qualquer import do numba. Pode ser sobrescrito pela configuração do deploy.
+os.environ.setdefault("NUMBA_CACHE_DIR", str(Path(__file__).resolve().with_name(".numba_cache")))
+
 st.set_page_config(page_title="Precificação de Projetos — CAU/BR", page_icon="📐", layout="wide")
 
 # ----------------------
@@ -42,19 +61,25 @@ def interpolate_fp(fp1: float, fp2: float, sc1: float, sc2: float, sc: float) ->
     return fp1 - ((fp1 - fp2) * ((sc - sc1) / (sc2 - sc1)))
 
 
+# Tabela de r por nº de repetições (índice = q; a última posição vale para q > 32)
+_R_TABLE = np.concatenate([
+    np.full(2, 1.0),    # q <= 1
+    np.full(3, 0.70),   # 2..4
+    np.full(4, 0.60),   # 5..8
+    np.full(8, 0.50),   # 9..16
+    np.full(16, 0.40),  # 17..32
+    np.full(1, 0.35),   # > 32
+])
+
+
 def estimate_r_by_repetition(q: int) -> float:
     """Estimativa prática para r (redutor de áreas repetidas) quando a Tabela oficial não estiver disponível."""
-    if q <= 1:
-        return 1.0
-    if 2 <= q <= 4:
-        return 0.70
-    if 5 <= q <= 8:
-        return 0.60
-    if 9 <= q <= 16:
-        return 0.50
-    if 17 <= q <= 32:
-        return 0.40
-    return 0.35
+    return float(_R_TABLE[min(max(q, 0), _R_TABLE.size - 1)])
+
+
+def estimate_r_vec(qs: np.ndarray) -> np.ndarray:
+    """Versão vetorizada de estimate_r_by_repetition (ex.: análises de sensibilidade)."""
+    return _R_TABLE[np.clip(np.asarray(qs, dtype=np.int64), 0, _R_TABLE.size - 1)]
 
 
 def compute_R(snr: float, sr: float, r: float, sc: float) -> float:
@@ -69,66 +94,14 @@ def compute_PV(sc: float, bh: float, fp: float, R: float) -> float:
 # HELPERS (MÓD. I) — BH, IC, K
 # ----------------------
 
-# Pequena amostra de TIPOLOGIAS (Anexo I - Tabela 8) com CUB simbólico e fator de adequação.
-# (Você pode ampliar/editar este dicionário ou carregar planilhas completas.)
-TIPOLOGIAS_BH = [
-    {
-        "grupo": "Habitacional > Residencial",
-        "item": "Edifícios de apartamentos / padrão normal",
-        "categoria": "I",
-        "cub_ref": "R-8-N",
-        "fator_adequacao": 1.5,
-    },
-    {
-        "grupo": "Habitacional > Residencial",
-        "item": "Edifícios de apartamentos / padrão alto",
-        "categoria": "II",
-        "cub_ref": "R-16-A",
-        "fator_adequacao": 1.5,
-    },
-    {
-        "grupo": "Habitacional > Residencial",
-        "item": "Residência unifamiliar / padrão elevado",
-        "categoria": "IV",
-        "cub_ref": "R-1-A",
-        "fator_adequacao": 2.0,
-    },
-    {
-        "grupo": "Comércio > Lojas/Magazines/Shopping",
-        "item": "Lojas de departamentos, centros comerciais, shopping",
-        "categoria": "III/IV",
-        "cub_ref": "CAL-8-N",
-        "fator_adequacao": 1.3,
-    },
-]
-
-
 def calcular_bh(cub_basico: float, fator_adequacao: float) -> float:
     """BH = CUB_básico × fator de adequação (Anexo I, Tabela 8)."""
     return cub_basico * fator_adequacao
 
-# Índice de Complexidade (IC) — 10 indicadores com fatores 0,70 / 1,00 / 1,30
-IC_OPCOES = {
-    "Baixo": 0.70,
-    "Médio": 1.00,
-    "Alto": 1.30,
-}
-IC_INDICADORES = [
-    "Porte do projeto",
-    "Quantidade de especialistas",
-    "Quantidade de aprovações",
-    "Grau de detalhamento",
-    "Grau de responsabilidade civil",
-    "Sofisticação tecnológica (complementares)",
-    "Intensidade de participação do cliente",
-    "Complexidade compositiva",
-    "Complexidade de pesquisas prévias",
-    "Complexidade do desenvolvimento/execução",
-]
-
-
-def calcular_ic_media(fatores: List[float]) -> float:
-    return sum(fatores) / len(fatores) if fatores else 1.0
+
+def calcular_ic_media(fatores: np.ndarray) -> float:
+    fatores = np.asarray(fatores, dtype=np.float64)
+    return float(fatores.mean()) if fatores.size else 1.0
 
 # Fator K = composição de K1..K4
 
@@ -137,13 +110,57 @@ def fator_K_generico(ES: float, DI: float, L: float, DL: float) -> float:
     ESf, DIf, Lf, DLf = (ES/100.0), (DI/100.0), (L/100.0), (DL/100.0)
     return (1+ESf) * (1+DIf) * (1+Lf) * (1+DLf)
 
-# Defaults ilustrativos a partir do Anexo VII (exemplo de tabela)
-DEFAULTS_K = {
-    "K1": {"ES": 85.64, "DI": 55.76, "L": 10.0, "DL": 22.37},
-    "K2": {"ES": 20.0,  "DI": 15.0,  "L": 10.0, "DL": 22.37},
-    "K3": {"ES": 0.0,   "DI": 15.0,  "L": 10.0, "DL": 22.37},
-    "K4": {"ES": 0.0,   "DI": 10.0,  "L": 10.0, "DL": 22.37},
-}
+
+@st.cache_resource(show_spinner=False)
+def _njit_kernels() -> Optional[SimpleNamespace]:
+    """Kernel Numba do Fator K em lote, um por processo (None se numba não estiver instalado).
+
+    O numba só é importado no primeiro uso; a compilação ocorre na primeira chamada do kernel
+    (ou é lida de NUMBA_CACHE_DIR) e depois é reaproveitada.
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # Em arrays, parallel=True funde as quatro expressões (1+x/100) num único laço paralelo
+    return SimpleNamespace(
+        fator_K_batch=njit(parallel=True, cache=True, fastmath=True)(fator_K_generico),
+    )
+
+
+def fator_K_batch(ES: np.ndarray, DI: np.ndarray, L: np.ndarray, DL: np.ndarray) -> np.ndarray:
+    """Fator K em lote; ES, DI, L e DL são arrays 1-D de percentuais, todos de mesmo tamanho.
+
+    Usa Numba quando disponível; o contrato é verificado antes, para os dois caminhos se comportarem igual.
+    """
+    ES, DI, L, DL = (np.ascontiguousarray(x, dtype=np.float64) for x in (ES, DI, L, DL))
+    if ES.ndim != 1 or not (ES.shape == DI.shape == L.shape == DL.shape):
+        raise ValueError("fator_K_batch espera arrays 1-D de mesmo tamanho para ES, DI, L e DL.")
+    kernels = _njit_kernels()
+    if kernels is not None:
+        return kernels.fator_K_batch(ES, DI, L, DL)
+    return fator_K_generico(ES, DI, L, DL)
+
+# ----------------------
+# PARCELAMENTO / EXPORTAÇÃO
+# ----------------------
+
+def parcelas_tabela(etapas: tuple, pcts: np.ndarray, PV_total: float) -> Dict[str, object]:
+    """Colunas Etapa / % / Valor (R$); o valor é derivado de PV_total no momento do uso."""
+    return {"Etapa": etapas, "%": pcts, "Valor (R$)": pcts.astype(np.float64) * (PV_total/100.0)}
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _parcelas_csv(etapas: tuple, pcts: np.ndarray, PV_total: float) -> bytes:
+    """CSV (UTF-8) do parcelamento; reaproveitado enquanto etapas, % e PV_total não mudarem."""
+    return pd.DataFrame(parcelas_tabela(etapas, pcts, PV_total)).to_csv(index=False).encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _serialize_proposta(sig: tuple) -> bytes:
+    """JSON (UTF-8) da proposta a partir de ((seção, ((campo, valor), ...)), ...)."""
+    proposta = {secao: dict(campos) for secao, campos in sig}
+    return json.dumps(proposta, ensure_ascii=False, indent=2).encode("utf-8")
 
 # ----------------------
 # UI PRINCIPAL
@@ -157,23 +174,20 @@ with T1:
         st.subheader("1) Parâmetros Gerais")
         projeto = st.text_input("Nome do Projeto", value=st.session_state.get("projeto", "Edifício Residencial Exemplo"))
         cliente = st.text_input("Cliente / Contratante", value=st.session_state.get("cliente", "IDIBRA / Exemplo"))
-        uf = st.selectbox("UF do empreendimento", options=[
-            "AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG","PA",
-            "PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"
-        ], index=6)
+        uf = st.selectbox("UF do empreendimento", options=UFS, index=UFS.index("DF"))
         tipologia = st.text_input("Tipologia (livre)", value=st.session_state.get("tipologia", "Residencial multifamiliar"))
 
     with colB:
         st.subheader("2) Áreas (m²)")
-        sc = st.number_input("Sc — Área construída estimada (TOTAL)", min_value=0.0, value=float(st.session_state.get("sc", 5000.0)), step=10.0, key="sc")
-        snr = st.number_input("Snr — Área NÃO repetida", min_value=0.0, value=float(st.session_state.get("snr", 1500.0)), step=10.0, key="snr")
-        sr = st.number_input("Sr — Área repetida", min_value=0.0, value=float(st.session_state.get("sr", 3500.0)), step=10.0, key="sr")
+        sc = st.number_input("Sc — Área construída estimada (TOTAL)", min_value=0.0, value=5000.0, step=10.0, key="sc")
+        snr = st.number_input("Snr — Área NÃO repetida", min_value=0.0, value=1500.0, step=10.0, key="snr")
+        sr = st.number_input("Sr — Área repetida", min_value=0.0, value=3500.0, step=10.0, key="sr")
 
     with colC:
         st.subheader("3) Repetição (r)")
         mode_r = st.radio("Como obter o redutor r?", ["Informar manualmente", "Estimar por nº de repetições (q)"])
         if mode_r == "Informar manualmente":
-            r = st.slider("r — Redutor para áreas repetidas (0 a 1)", min_value=0.0, max_value=1.0, value=float(st.session_state.get("r", 0.6)), step=0.01, key="r")
+            r = st.slider("r — Redutor para áreas repetidas (0 a 1)", min_value=0.0, max_value=1.0, value=0.6, step=0.01, key="r")
             q = None
         else:
             q = st.number_input("q — Nº de repetições (ex.: nº de pavimentos-tipo)", min_value=1, value=int(st.session_state.get("q", 8)), step=1)
@@ -191,13 +205,13 @@ with T1:
         st.caption("Se preferir, calcule o BH no Tab 'Módulo I' e clique em 'Usar BH calculado'.")
         if "BH_calculado" in st.session_state:
             st.info(f"BH calculado (Mód. I): R$ {st.session_state['BH_calculado']:,.2f}/m²")
-        bh = st.number_input("BH (R$/m²)", min_value=0.0, value=float(st.session_state.get("bh", 120.0)), step=1.0, key="bh")
+        bh = st.number_input("BH (R$/m²)", min_value=0.0, value=120.0, step=1.0, key="bh")
 
     with col2:
         st.subheader("5) fp — Fator Percentual")
         fp_mode = st.radio("Como obter fp?", ["Informar manualmente", "Interpolar entre duas faixas (Sc1→fp1; Sc2→fp2)"])
         if fp_mode == "Informar manualmente":
-            fp = st.number_input("fp (fator adimensional; ex.: 0,18 = 18%)", min_value=0.0, max_value=1.0, value=float(st.session_state.get("fp", 0.18)), step=0.005, key="fp")
+            fp = st.number_input("fp (fator adimensional; ex.: 0,18 = 18%)", min_value=0.0, max_value=1.0, value=0.18, step=0.005, key="fp")
         else:
             sc1 = st.number_input("Sc1 (m²)", min_value=0.0, value=float(st.session_state.get("sc1", 3000.0)), step=10.0)
             fp1 = st.number_input("fp1 (para Sc1)", min_value=0.0, max_value=1.0, value=float(st.session_state.get("fp1", 0.22)), step=0.005)
@@ -209,7 +223,7 @@ with T1:
     with col3:
         st.subheader("6) Encargos, BDI e Forma de Pagamento")
         incluir_bdi_extra = st.checkbox("Aplicar BDI adicional (opcional)")
-        bdi_extra = st.number_input("BDI extra (% do PV)", min_value=0.0, max_value=100.0, value=float(st.session_state.get("bdi_extra", 0.0)), step=0.5) if incluir_bdi_extra else 0.0
+        bdi_extra = st.number_input("BDI extra (% do PV)", min_value=0.0, max_value=100.0, value=0.0, step=0.5, key="bdi_extra") if incluir_bdi_extra else 0.0
 
     # Cálculo PV
     PV = compute_PV(sc, bh, fp, R)
@@ -231,13 +245,8 @@ with T1:
     st.subheader("Parcelamento Sugerido de Honorários")
     st.caption("Recomendação comum: 10% na assinatura; restante distribuído às etapas. Ajuste conforme contrato.")
 
-    parcelamento_presets = {
-        "Padrão (Genérico)": {"Assinatura": 10, "Estudo Preliminar": 20, "Anteprojeto": 25, "Projeto Básico": 10, "Projeto para Execução": 30, "As Built / Encerramento": 5},
-        "Sem Projeto Básico": {"Assinatura": 10, "Estudo Preliminar": 20, "Anteprojeto": 30, "Projeto para Execução": 35, "As Built / Encerramento": 5},
-    }
-
-    preset_nome = st.selectbox("Modelo de Parcelamento", list(parcelamento_presets.keys()))
-    parcelas = parcelamento_presets[preset_nome].copy()
+    preset_nome = st.selectbox("Modelo de Parcelamento", list(PARCELAMENTO_PRESETS.keys()))
+    parcelas = dict(PARCELAMENTO_PRESETS[preset_nome])
 
     with st.expander("Ajustar Percentuais (total deve = 100%)", expanded=False):
         soma = 0
@@ -248,14 +257,10 @@ with T1:
         if soma != 100:
             st.error("A soma dos percentuais deve ser exatamente 100%.")
 
-    parcelas_valores = {etapa: (pct/100.0) * PV_total for etapa, pct in parcelas.items()}
-    parcelas_df = pd.DataFrame({
-        "Etapa": list(parcelas_valores.keys()),
-        "%": [parcelas[k] for k in parcelas_valores.keys()],
-        "Valor (R$)": [parcelas_valores[k] for k in parcelas_valores.keys()],
-    })
+    etapas = tuple(parcelas)
+    pcts = np.fromiter((parcelas[k] for k in etapas), dtype=np.int64, count=len(etapas))
 
-    st.dataframe(parcelas_df, use_container_width=True)
+    st.dataframe(parcelas_tabela(etapas, pcts, PV_total), use_container_width=True)
 
 with T2:
     st.subheader("Módulo I — BH (Base de Honorários)")
@@ -264,9 +269,9 @@ with T2:
     with colBH1:
         sel = st.selectbox(
             "Tipologia (amostra) — personalize conforme Anexo I",
-            options=[f"{t['grupo']} · {t['item']} ({t['cub_ref']}, fator {t['fator_adequacao']})" for t in TIPOLOGIAS_BH],
+            options=TIP_LABELS,
         )
-        tip = TIPOLOGIAS_BH[[f"{t['grupo']} · {t['item']} ({t['cub_ref']}, fator {t['fator_adequacao']})" for t in TIPOLOGIAS_BH].index(sel)]
+        fator_adequacao = float(TIPOLOGIAS_BH_DF["fator_adequacao"].iat[TIP_LABEL_IDX[sel]])
         cub_basico = st.number_input(
             "CUB básico (R$/m²) do Estado/competência (obtido no SINDUSCON)",
             min_value=0.0,
@@ -274,7 +279,7 @@ with T2:
             step=1.0,
             help="Insira o CUB do mês/ref. Ex.: CE, residencial R-8-N, etc.",
         )
-        bh_calc = calcular_bh(cub_basico, tip["fator_adequacao"])
+        bh_calc = calcular_bh(cub_basico, fator_adequacao)
         st.metric("BH calculado", f"R$ {bh_calc:,.2f}/m²")
         if st.button("Usar BH calculado no Tab Módulo II"):
             st.session_state["BH_calculado"] = bh_calc
@@ -285,19 +290,28 @@ with T2:
         st.info(
             "BH = CUB_básico × Fator de adequação (Anexo I, Tabela 8). Personalize a base conforme sua tipologia."
         )
-        st.caption("Dica: você pode ampliar o dicionário TIPOLOGIAS_BH, ou importar uma planilha completa das tipologias.")
+        st.caption("Dica: você pode ampliar a tabela TIPOLOGIAS_BH (constantes.py), ou importar uma planilha completa das tipologias.")
 
     st.markdown("---")
     st.subheader("Módulo I — Índice de Complexidade (IC)")
     st.caption("Selecione o nível de cada indicador (0,70 / 1,00 / 1,30). O IC médio ajuda a adequar a coluna do fp na Tabela 5.")
 
-    ic_cols = st.columns(2)
-    fatores_escolhidos: List[float] = []
-    for i, nome in enumerate(IC_INDICADORES):
-        with ic_cols[i % 2]:
-            escolha = st.radio(nome, list(IC_OPCOES.keys()), horizontal=True, key=f"ic_{i}")
-            fatores_escolhidos.append(IC_OPCOES[escolha])
-    ic_medio = calcular_ic_media(fatores_escolhidos)
+    if "_ic_df" not in st.session_state:
+        st.session_state["_ic_df"] = pd.DataFrame({
+            "Indicador": IC_INDICADORES,
+            "Nível": pd.Categorical(["Médio"] * len(IC_INDICADORES), categories=list(IC_OPCOES.keys())),
+        })
+    ic_df = st.data_editor(
+        st.session_state["_ic_df"],
+        column_config={
+            "Indicador": st.column_config.TextColumn(disabled=True),
+            "Nível": st.column_config.SelectboxColumn(options=list(IC_OPCOES.keys()), required=True),
+        },
+        hide_index=True,
+        use_container_width=True,
+        key="ic_editor",
+    )
+    ic_medio = calcular_ic_media(ic_df["Nível"].astype(str).map(IC_OPCOES.get).to_numpy())
     st.metric("IC médio (adimensional)", f"{ic_medio:0.2f}")
     st.caption("Use o IC para discutir com o cliente eventual mudança de coluna na Tabela de fp (mais ou menos complexo).")
 
@@ -308,13 +322,14 @@ with T2:
     Kexp = st.expander("Parâmetros (padrões ilustrativos do Anexo VII) — clique para editar", expanded=False)
     with Kexp:
         k_inputs = {}
-        for kname in ["K1", "K2", "K3", "K4"]:
+        for i, kname in enumerate(K_NAMES):
             st.markdown(f"**{kname}**")
             c1, c2, c3, c4 = st.columns(4)
-            ES = c1.number_input(f"{kname} ES %", min_value=0.0, max_value=500.0, value=float(DEFAULTS_K[kname]["ES"]))
-            DI = c2.number_input(f"{kname} DI %", min_value=0.0, max_value=500.0, value=float(DEFAULTS_K[kname]["DI"]))
-            L  = c3.number_input(f"{kname} L %",  min_value=0.0, max_value=500.0, value=float(DEFAULTS_K[kname]["L"]))
-            DL = c4.number_input(f"{kname} DL %", min_value=0.0, max_value=500.0, value=float(DEFAULTS_K[kname]["DL"]))
+            ES0, DI0, L0, DL0 = DEFAULTS_K[i].tolist()
+            ES = c1.number_input(f"{kname} ES %", min_value=0.0, max_value=500.0, value=ES0)
+            DI = c2.number_input(f"{kname} DI %", min_value=0.0, max_value=500.0, value=DI0)
+            L  = c3.number_input(f"{kname} L %",  min_value=0.0, max_value=500.0, value=L0)
+            DL = c4.number_input(f"{kname} DL %", min_value=0.0, max_value=500.0, value=DL0)
             k_inputs[kname] = {"ES": ES, "DI": DI, "L": L, "DL": DL}
             kval = fator_K_generico(ES, DI, L, DL)
             st.write(f"{kname} calculado = **{kval:0.4f}**")
@@ -325,24 +340,7 @@ with T2:
 with T3:
     st.subheader("Exportar Proposta Sintética")
 
-    # Recomputa para garantir consistência
-    sc = float(st.session_state.get("sc", 0.0))
-    snr = float(st.session_state.get("snr", 0.0))
-    sr = float(st.session_state.get("sr", 0.0))
-    r  = float(st.session_state.get("r", 1.0))
-    R  = compute_R(snr, sr, r, sc)
-    bh = float(st.session_state.get("bh", 0.0))
-    fp = float(st.session_state.get("fp", 0.0))
-
-    PV = compute_PV(sc, bh, fp, R)
-    bdi_extra = float(st.session_state.get("bdi_extra", 0.0))
-    PV_total = PV * (1 + bdi_extra/100.0)
-
-    # Parcelas — regenerar com base no Tab 1, se existir
-    try:
-        parcelas_df
-    except NameError:
-        parcelas_df = pd.DataFrame({"Etapa": ["Assinatura"], "%": [10], "Valor (R$)": [PV_total*0.1]})
+    # Entradas, PV e parcelas (etapas, pcts) vêm do Tab Módulo II, executado no mesmo rerun
 
     proposta = {
         "identificacao": {
@@ -369,7 +367,8 @@ with T3:
         },
     }
 
-    json_bytes = json.dumps(proposta, ensure_ascii=False, indent=2).encode("utf-8")
+    proposta_sig = tuple((secao, tuple(campos.items())) for secao, campos in proposta.items())
+    json_bytes = _serialize_proposta(proposta_sig)
     st.download_button(
         label="⬇️ Baixar proposta (JSON)",
         data=json_bytes,
@@ -377,11 +376,9 @@ with T3:
         mime="application/json",
     )
 
-    csv_buf = io.StringIO()
-    parcelas_df.to_csv(csv_buf, index=False)
     st.download_button(
         label="⬇️ Baixar parcelamento (CSV)",
-        data=csv_buf.getvalue().encode("utf-8"),
+        data=_parcelas_csv(etapas, pcts, PV_total),
         file_name=f"parcelamento_{st.session_state.get('projeto','projeto')}.csv",
         mime="text/csv",
     )
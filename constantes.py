@@ -0,0 +1,104 @@
+# constantes.py
+# -------------------------------------------------------------
+# TABELAS E PARÂMETROS FIXOS DO APP DE PRECIFICAÇÃO (CAU/BR)
+# Mantidos fora do script Streamlit: o módulo é importado uma única
+# vez por processo, enquanto o script é reexecutado a cada interação.
+# Tudo aqui é compartilhado entre sessões: mapas expostos como
+# MappingProxyType, DEFAULTS_K somente leitura; TIPOLOGIAS_BH_DF
+# não pode ser congelado e deve apenas ser lido.
+# -------------------------------------------------------------
+
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+# ----------------------
+# MÓD. II — IDENTIFICAÇÃO E PARCELAMENTO
+# ----------------------
+
+UFS = (
+    "AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA",
+    "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO",
+)
+
+# Modelos de parcelamento (% por etapa; total = 100%)
+PARCELAMENTO_PRESETS = MappingProxyType({
+    "Padrão (Genérico)": MappingProxyType({"Assinatura": 10, "Estudo Preliminar": 20, "Anteprojeto": 25, "Projeto Básico": 10, "Projeto para Execução": 30, "As Built / Encerramento": 5}),
+    "Sem Projeto Básico": MappingProxyType({"Assinatura": 10, "Estudo Preliminar": 20, "Anteprojeto": 30, "Projeto para Execução": 35, "As Built / Encerramento": 5}),
+})
+
+# ----------------------
+# MÓD. I — BH, IC, K
+# ----------------------
+
+# Pequena amostra de TIPOLOGIAS (Anexo I - Tabela 8) com CUB simbólico e fator de adequação.
+# (Você pode ampliar/editar esta tabela ou carregar planilhas completas.)
+TIPOLOGIAS_BH = tuple(MappingProxyType(t) for t in (
+    {
+        "grupo": "Habitacional > Residencial",
+        "item": "Edifícios de apartamentos / padrão normal",
+        "categoria": "I",
+        "cub_ref": "R-8-N",
+        "fator_adequacao": 1.5,
+    },
+    {
+        "grupo": "Habitacional > Residencial",
+        "item": "Edifícios de apartamentos / padrão alto",
+        "categoria": "II",
+        "cub_ref": "R-16-A",
+        "fator_adequacao": 1.5,
+    },
+    {
+        "grupo": "Habitacional > Residencial",
+        "item": "Residência unifamiliar / padrão elevado",
+        "categoria": "IV",
+        "cub_ref": "R-1-A",
+        "fator_adequacao": 2.0,
+    },
+    {
+        "grupo": "Comércio > Lojas/Magazines/Shopping",
+        "item": "Lojas de departamentos, centros comerciais, shopping",
+        "categoria": "III/IV",
+        "cub_ref": "CAL-8-N",
+        "fator_adequacao": 1.3,
+    },
+))
+# Mesma tabela em colunas (uma Series por campo), para leitura vetorizada no app
+TIPOLOGIAS_BH_DF = pd.DataFrame.from_records([dict(t) for t in TIPOLOGIAS_BH])
+# Rótulos do seletor de tipologias e mapa rótulo -> linha de TIPOLOGIAS_BH_DF
+TIP_LABELS = tuple((
+    TIPOLOGIAS_BH_DF["grupo"] + " · " + TIPOLOGIAS_BH_DF["item"]
+    + " (" + TIPOLOGIAS_BH_DF["cub_ref"] + ", fator " + TIPOLOGIAS_BH_DF["fator_adequacao"].astype(str) + ")"
+).tolist())
+TIP_LABEL_IDX = MappingProxyType({lbl: i for i, lbl in enumerate(TIP_LABELS)})
+
+# Índice de Complexidade (IC) — 10 indicadores com fatores 0,70 / 1,00 / 1,30
+IC_OPCOES = MappingProxyType({
+    "Baixo": 0.70,
+    "Médio": 1.00,
+    "Alto": 1.30,
+})
+IC_INDICADORES = (
+    "Porte do projeto",
+    "Quantidade de especialistas",
+    "Quantidade de aprovações",
+    "Grau de detalhamento",
+    "Grau de responsabilidade civil",
+    "Sofisticação tecnológica (complementares)",
+    "Intensidade de participação do cliente",
+    "Complexidade compositiva",
+    "Complexidade de pesquisas prévias",
+    "Complexidade do desenvolvimento/execução",
+)
+
+# Defaults ilustrativos a partir do Anexo VII (exemplo de tabela)
+K_NAMES = ("K1", "K2", "K3", "K4")
+# Colunas: ES, DI, L, DL (%) — uma linha por componente de K_NAMES
+DEFAULTS_K = np.array([
+    [85.64, 55.76, 10.0, 22.37],  # K1
+    [20.0,  15.0,  10.0, 22.37],  # K2
+    [0.0,   15.0,  10.0, 22.37],  # K3
+    [0.0,   10.0,  10.0, 22.37],  # K4
+], dtype=np.float64)
+DEFAULTS_K.setflags(write=False)